@@ -1,20 +1,68 @@
-from typing import Iterable
-from itertools import chain
+from typing import Iterable, Iterator
+from weakref import WeakValueDictionary
+
 
 """
     This module contains classes to represent formulas (input formulas, solver clauses, ...)
 """
 
+class VarPool:
+    """
+        Interns variable names into dense integer ids (the same name always gets the same id in
+        a pool), and holds the shared clause literals of its variables (see ClauseLiteral.intern)
+    """
+    def __init__(self):
+        self.ids: dict[str, int] = dict()
+        self.names: list[str] = []
+        # Interned clause literals, by encoded literal (see ClauseLiteral.intern)
+        self.literals: dict[int, 'ClauseLiteral'] = dict()
+
+    def get(self, name: str) -> int:
+        var_id = self.ids.get(name)
+        if var_id is None:
+            var_id = self.ids[name] = len(self.ids)
+            self.names.append(name)
+        return var_id
+
+    def name_of(self, var_id: int) -> str:
+        return self.names[var_id]
+
+    def __len__(self):
+        return len(self.ids)
+
+# Dense integer ids for boolean variables, used to index the solver's model arrays
+# NOTE: this is the default pool, for the variables created without one. It lives as long as the
+#       process: a formula built in bulk (e.g. by the parser) should get its own pool, so that its
+#       ids start from 0 whatever has been created before, and are freed with its variables
+_var_pool = VarPool()
+
+# Inside clauses, literals are encoded as signed ints (DIMACS convention): the variable id + 1,
+# negated if the polarity is negative
+
+def encode_literal(var_id: int, polarity: bool) -> int:
+    return var_id + 1 if polarity else -(var_id + 1)
+
+def var_of(lit: int) -> int:
+    return abs(lit) - 1
+
+def pol_of(lit: int) -> bool:
+    return lit > 0
+
 class FormulaNode:
     """
         A generic node in the formula tree/DAG
     """
+    # NOTE: nodes are allocated in large numbers: every class declares __slots__ to drop the
+    #       per-instance __dict__
+    __slots__ = ('_str_cache',)
 
-    def __eq__(self, other):
-        # NOTE: purely syntactic equality, not semantic:
-        #   - does not consider commutative properties (operators can override it to do so)
-        #   - ...
-        return type(self) == type(other) and self.children == other.children
+    def __init__(self):
+        # NOTE: nodes are immutable after construction, so their string is built once (lazily)
+        self._str_cache: str | None = None
+
+    # NOTE: equality (and hash) is by identity: operators are hash-consed (see NodeFactory), so
+    #       structurally equal nodes are the same instance. Literals override it by value.
+    #       For a recursive, syntactic comparison see structural_eq
 
     def __str__(self):
         raise NotImplementedError
@@ -22,80 +70,168 @@ class FormulaNode:
     def __repr__(self):
         return str(self)
 
+    def order_key(self) -> tuple:
+        """
+            Returns a key giving a deterministic total order of the nodes (equal keys iff equal
+            nodes), used to sort the children of commutative operators (see NodeFactory). The
+            first item tells the kind of node apart
+        """
+        raise NotImplementedError
+
 class NAryNode(FormulaNode):
     """
         A generic n-ary node in the formula tree/DAG
     """
-    def __init__(self, children: Iterable['FormulaNode']):
-        self.children = children
+    __slots__ = ('children',)
 
-    def __eq__(self, other):
-        # NOTE: purely syntactic equality, not semantic:
-        #   - does not consider commutative properties (operators can override it to do so)
-        #   - ...
-        return type(self) == type(other) and self.children == other.children
-
-    def __str__(self):
-        raise NotImplementedError
-
-    def __repr__(self):
-        return str(self)
+    def __init__(self, children: Iterable['FormulaNode']):
+        super().__init__()
+        # NOTE: always a tuple: the argument could be a one-shot iterator, and the literals are
+        #       accessed by index (e.g. by the watches)
+        self.children: tuple['FormulaNode', ...] = tuple(children)
 
 class BooleanOperator(NAryNode):
     """
         A generic boolean operator (e.g. AND, OR, NOT, ...)
     """
+    __slots__ = ('__weakref__', '_intern_id')
+
+    # Whether the order of the children is irrelevant (they are then stored sorted, see NodeFactory)
+    commutative = False
+
+    def __new__(cls, children: Iterable['FormulaNode']):
+        # NOTE: operators are hash-consed: the factory builds (and initializes) the node only once
+        return _node_factory.make(cls, children)
+
     def __init__(self, children: Iterable['FormulaNode']):
-        super().__init__(children)
+        # NOTE: already initialized by the factory
+        pass
+
+    def order_key(self) -> tuple:
+        # NOTE: by creation order (see NodeFactory), not by id(): the order must not depend on
+        #       memory addresses
+        return (0, self._intern_id)
 
 class And(BooleanOperator):
     """
         Logical AND operator
     """
+    __slots__ = ()
+
+    commutative = True
+
     def __str__(self):
-        return f"( { ' AND '.join(str(child) for child in self.children) } )"
+        if self._str_cache is None:
+            self._str_cache = f"( { ' AND '.join(str(child) for child in self.children) } )"
+        return self._str_cache
 
-    def __repr__(self):
-        return self.__str__()
+    __repr__ = __str__
 
 class Or(BooleanOperator):
     """
         Logical OR operator
     """
+    __slots__ = ()
+
+    commutative = True
+
     def __str__(self):
-        return f"( { ' OR '.join(str(child) for child in self.children) } )"
+        if self._str_cache is None:
+            self._str_cache = f"( { ' OR '.join(str(child) for child in self.children) } )"
+        return self._str_cache
 
-    def __repr__(self):
-        return self.__str__()
+    __repr__ = __str__
 
 class Not(BooleanOperator):
     """
         Logical NOT operator
     """
+    __slots__ = ()
+
+    def __new__(cls, children: Iterable['FormulaNode']):
+        children = tuple(children)
+        # Delete pairs of nested NOT nodes:
+        if isinstance(children[0], Not):
+            return children[0].children[0]
+        return super().__new__(cls, children)
+
     def __str__(self):
-        return "! " + str(self.children[0])
+        if self._str_cache is None:
+            self._str_cache = "! " + str(self.children[0])
+        return self._str_cache
 
-    def __repr__(self):
-        return self.__str__()
+    __repr__ = __str__
+
+class NodeFactory:
+    """
+        Builds boolean operators with hash-consing: structurally equal nodes (up to the order of the
+        children of commutative operators) are the same instance, so that equality is identity and
+        shared subformulas are stored once
+    """
+    def __init__(self):
+        # NOTE: weak values, nodes no longer referenced elsewhere are dropped
+        self.nodes: WeakValueDictionary[tuple, BooleanOperator] = WeakValueDictionary()
+        # Number of nodes built so far, used as their intern id (see BooleanOperator.order_key)
+        self.count = 0
+
+    def make(self, kind: type[BooleanOperator], children: Iterable[FormulaNode]) -> BooleanOperator:
+        # NOTE: the children are either interned themselves or literals (hashed by value). They
+        #       are sorted by a total order: sorting by hash would keep the given order on ties
+        children = tuple(sorted(children, key=lambda child: child.order_key())) if kind.commutative else tuple(children)
+        key = (kind, children)
+        node = self.nodes.get(key)
+        if node is None:
+            node = object.__new__(kind)
+            NAryNode.__init__(node, children)
+            node._intern_id = self.count
+            self.count += 1
+            self.nodes[key] = node
+        return node
+
+_node_factory = NodeFactory()
+
+def structural_eq(a: FormulaNode, b: FormulaNode) -> bool:
+    """
+        Purely syntactic (recursive) equality of two formulas: does not consider commutative properties
+    """
+    if a is b:
+        return True
+    if isinstance(a, NAryNode) and not isinstance(a, Clause):
+        return type(a) == type(b) and len(a.children) == len(b.children) \
+            and all(structural_eq(x, y) for x, y in zip(a.children, b.children))
+    return a == b
 
 class Literal(FormulaNode):
     """
         A generic literal (e.g. an atom, a negated atom, ...)
     """
+    __slots__ = ()
 
 class Atom(Literal):
     """
         A generic atom (e.g. a predicate, a function, ...)
     """
+    __slots__ = ()
 
 class BooleanConstant(Atom):
     """
         A boolean constant (True/False)
     """
+    __slots__ = ('value',)
+
     def __init__(self, value: bool):
-        super().__init__([])
+        super().__init__()
         self.value = value
 
+    def __eq__(self, other):
+        return isinstance(other, BooleanConstant) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def order_key(self) -> tuple:
+        return (1, int(self.value))
+
     def __str__(self):
         return str(self.value)
 
@@ -106,18 +242,32 @@ class BooleanVariable(Atom):
     """
         A boolean variable (e.g. x1, x2, ...)
     """
-    def __init__(self, name: str):
+    __slots__ = ('name', 'pool', 'id', '_negation')
+
+    def __init__(self, name: str, pool: VarPool | None = None):
         super().__init__()
         self.name = name
+        # NOTE: the same name always gets the same id in a pool (see VarPool), so variables are
+        #       compared and hashed by id: variables are hot dict keys, and the name is only needed
+        #       for I/O. The variables of a formula must all come from the same pool
+        self.pool = pool if pool is not None else _var_pool
+        self.id = self.pool.get(name)
+        self._negation: NotLiteral | None = None
 
     def invert(self) -> Literal:
-        return NotLiteral(self)
+        # NOTE: built once per variable (and NotLiteral.invert gives back the variable)
+        if self._negation is None:
+            self._negation = NotLiteral(self)
+        return self._negation
 
     def __eq__(self, other):
-        return isinstance(other, BooleanVariable) and self.name == other.name
+        return self is other or (isinstance(other, BooleanVariable) and self.id == other.id and self.pool is other.pool)
 
     def __hash__(self):
-        return self.name.__hash__()
+        return self.id
+
+    def order_key(self) -> tuple:
+        return (2, self.id, 1)
 
     def __str__(self):
         return self.name
@@ -129,9 +279,12 @@ class NotLiteral(Literal):
     """
         A negated atom
     """
+    __slots__ = ('children',)
+
     def __init__(self, variable: BooleanVariable):
         # TODO?: delete pairs of nested NotLiteral nodes
-        super().__init__([variable])
+        super().__init__()
+        self.children = (variable,)
 
     def get_variable(self) -> BooleanVariable:
         return self.children[0]
@@ -139,33 +292,85 @@ class NotLiteral(Literal):
     def invert(self) -> Literal:
         return self.get_variable()
 
+    def __eq__(self, other):
+        return isinstance(other, NotLiteral) and self.get_variable() == other.get_variable()
+
     def __hash__(self):
-        return self.get_variable().name.__hash__() + 1 # XXX: ???
+        # NOTE: negative, so that it cannot collide with the hash of a variable (its id). Not
+        #       -(id + 1): Python turns a hash of -1 into -2, the hash for id 1
+        return -2 - hash(self.get_variable())
+
+    def order_key(self) -> tuple:
+        return (2, self.get_variable().id, 0)
 
     def __str__(self):
-        return "!" + str(self.children[0])
+        if self._str_cache is None:
+            self._str_cache = "!" + str(self.children[0])
+        return self._str_cache
 
-    def __repr__(self):
-        return self.__str__()
+    __repr__ = __str__
 
 class ClauseLiteral(Literal):
+    __slots__ = ('variable', 'polarity', 'code', '_negation')
 
+    # NOTE: the instances are shared (see intern), so they are treated as frozen: the fields are
+    #       never reassigned after __init__ (only the caches are filled lazily)
     def __init__(self, variable: BooleanVariable, polarity: bool):
         super().__init__()
         self.variable = variable
         self.polarity = polarity
+        # Encoded literal (see encode_literal): unique per literal, so it is also the hash
+        self.code = encode_literal(variable.id, polarity)
+        self._negation: ClauseLiteral | None = None
+
+    @staticmethod
+    def intern(variable: BooleanVariable, polarity: bool) -> 'ClauseLiteral':
+        """
+            Returns the shared instance of the literal (there are only 2 per variable), to be
+            preferred to the constructor when building clauses
+        """
+        literals = variable.pool.literals
+        key = encode_literal(variable.id, polarity)
+        lit = literals.get(key)
+        if lit is None:
+            lit = literals[key] = ClauseLiteral(variable, polarity)
+        return lit
+
+    @staticmethod
+    def intern_id(var_id: int, polarity: bool, pool: VarPool | None = None) -> 'ClauseLiteral':
+        """
+            Same as intern, from the id of the variable in the pool (the default one if None)
+        """
+        if pool is None:
+            pool = _var_pool
+        lit = pool.literals.get(encode_literal(var_id, polarity))
+        if lit is None:
+            lit = ClauseLiteral.intern(BooleanVariable(pool.name_of(var_id), pool), polarity)
+        return lit
+
+    @property
+    def negation(self) -> 'ClauseLiteral':
+        if self._negation is None:
+            self._negation = ClauseLiteral.intern(self.variable, not self.polarity)
+        return self._negation
 
     def __eq__(self, other):
-        return isinstance(other, ClauseLiteral) and self.variable == other.variable and self.polarity == other.polarity
+        # NOTE: interned literals are compared by identity first
+        return self is other or (isinstance(other, ClauseLiteral) and self.code == other.code)
 
     def __hash__(self):
-        return hash((self.variable, self.polarity))
+        return self.code
+
+    def order_key(self) -> tuple:
+        return (3, self.variable.id, int(self.polarity))
 
     def __str__(self):
-        return f"{ '' if self.polarity else '!' }{ self.variable }"
+        if self._str_cache is None:
+            self._str_cache = f"{ '' if self.polarity else '!' }{ self.variable.name }"
+        return self._str_cache
+
+    __repr__ = __str__
 
-    def __repr__(self):
-        return self.__str__()
 
 
 
@@ -195,6 +400,15 @@ class ClauseStatus:
     def __repr__(self):
         return self.__str__()
 
+class WatchStatusEnum(enum.Enum):
+    """
+        The possible outcomes of the falsification of a watched literal (see Clause.notify_falsified).
+    """
+    RELOCATED = 1
+    TRUE = 2
+    UNIT = 3
+    CONFLICT = 4
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 
@@ -203,10 +417,25 @@ class Clause(NAryNode):
     """
         A clause (disjunction of literals)
     """
+    __slots__ = ('_lits_polarity_map', '_lits_map', 'lits', 'lit_set', '_hash', 'w1', 'w2', 'name')
+
     def __init__(self, children: Iterable['ClauseLiteral'], name: str | None = None):
         super().__init__(children)
-        self.lits_polarity_map = { lit.variable: lit.polarity for lit in children }
-        self.lits_map = { lit.variable: lit for lit in children }
+        children = self.children
+        # NOTE: the maps by variable are off the solver's hot paths (which use the encoded literals
+        #       below), they are built on first use (see lits_map)
+        self._lits_polarity_map: dict[BooleanVariable, bool] | None = None
+        self._lits_map: dict[BooleanVariable, ClauseLiteral] | None = None
+        # Encoded literals (see encode_literal), used by the status predicates and the watches
+        # NOTE: a tuple, the fastest container to iterate and index in CPython (no boxing of the items)
+        self.lits = tuple(lit.code for lit in children)
+        # Set of the encoded literals (independent of their order and of duplicates), used for
+        # equality and hashing
+        self.lit_set = frozenset(self.lits)
+        self._hash = hash(self.lit_set)
+        # Indices of the two watched literals (the same one for unit clauses)
+        self.w1 = 0
+        self.w2 = 1 if len(self.lits) > 1 else 0
         self.name = name
 
     def is_learned(self) -> bool:
@@ -277,7 +506,19 @@ class Clause(NAryNode):
     #             unassigned.append(var)
     #     return unassigned
 
-    def get_literals(self) -> list[ClauseLiteral]:
+    @property
+    def lits_map(self) -> dict[BooleanVariable, ClauseLiteral]:
+        if self._lits_map is None:
+            self._lits_map = { lit.variable: lit for lit in self.children }
+        return self._lits_map
+
+    @property
+    def lits_polarity_map(self) -> dict[BooleanVariable, bool]:
+        if self._lits_polarity_map is None:
+            self._lits_polarity_map = { lit.variable: lit.polarity for lit in self.children }
+        return self._lits_polarity_map
+
+    def get_literals(self) -> tuple[ClauseLiteral, ...]:
         return self.children
 
     def get_literal(self, variable: BooleanVariable) -> ClauseLiteral:
@@ -289,87 +530,121 @@ class Clause(NAryNode):
     def get_literals_polarity_map(self) -> dict[BooleanVariable, bool]:
         return self.lits_polarity_map
 
-    def get_unassigned_lits_map(self, model: dict[BooleanVariable, bool]) -> dict[BooleanVariable, bool]:
-        return { var: polarity for var, polarity in self.get_literals_polarity_map().items() if var not in model }
-
-    # TODO: make method return the status of the clause w.r.t. the partial model (arg):
-    #       true, consistent, unit (subcase of consistent), inconsistent (or falsified)
-
-    def get_status(self, model: dict[BooleanVariable, bool]) -> ClauseStatus:
-        n_unassigned = 0
-        potential_unit = None
-        for lit in self.get_literals():
-            # Unassigned lit, ok:
-            if lit.variable not in model:
-                n_unassigned += 1
-                if n_unassigned > 1:
-                    return ClauseStatus(ClauseStatusEnum.CONSISTENT)
-                else:
-                    potential_unit = lit
-            # True lit, ok:
-            elif model[lit.variable] == lit.polarity:
-                return ClauseStatus(ClauseStatusEnum.TRUE)
-        if n_unassigned == 1:
-            return ClauseStatus(ClauseStatusEnum.UNIT, unit=potential_unit)
-        elif n_unassigned > 1:
-            # NOTE: should never get here
-            assert False
-            # return ClauseStatus(ClauseStatusEnum.CONSISTENT)
-        elif n_unassigned == 0:
-            return ClauseStatus(ClauseStatusEnum.INCONSISTENT)
-        # NOTE: should never get here
-        assert False
-
-    # def is_consistent(self, model: Iterable[ClauseLiteral]) -> bool:
-    def is_consistent(self, model: dict[BooleanVariable, bool]) -> bool:
-        for var, polarity in self.get_literals_polarity_map().items():
-            # Unassigned lit, ok:
-            if var not in model:
-                return True
-            # True lit, ok:
-            elif model[var] == polarity:
-                return True
-        # Inconsistent:
-        return False
+    def iter_unassigned(self, assigned: bytearray) -> Iterator[tuple[BooleanVariable, bool]]:
+        """
+            Lazily yields the (variable, polarity) pairs of the unassigned literals
+        """
+        return ((lit.variable, lit.polarity) for lit, code in zip(self.children, self.lits) if not assigned[abs(code) - 1])
+
+    # NOTE: the boolean predicates take the model indexed by encoded literal (see
+    #       ImplicationGraph.true_lits): true_lits[lit] is 1 iff lit is true, so lit is false iff
+    #       true_lits[-lit], and unassigned iff neither. They scan the literals of the clause only,
+    #       the cost does not depend on the number of variables of the formula
+
+    def is_satisfied(self, true_lits: bytearray) -> bool:
+        # Any true lit:
+        return any(true_lits[lit] for lit in self.lits)
+
+    def is_consistent(self, true_lits: bytearray) -> bool:
+        # Any unassigned or true lit:
+        return not all(true_lits[-lit] for lit in self.lits)
 
-    # def is_unit(self, model: Iterable[ClauseLiteral]) -> bool:
-    def is_unit(self, model: dict[BooleanVariable, bool]) -> bool:
-        n_unassigned = 0
-        for var, polarity in self.get_literals_polarity_map().items():
-            # Unassigned literal, increase counter:
-            if var not in model:
-                n_unassigned += 1
-                # NOTE: could return early if n_unassigned > 1
-            # False literal, ok:
-            elif model[var] != polarity:
-                pass
-            # True literal, not unit:
-            else:
-                return False
-        return n_unassigned == 1
-
-    # def get_unit(self, model: Iterable[ClauseLiteral]) -> tuple[BooleanVariable, bool]:
-    # def get_unit(self, model: Iterable[ClauseLiteral]) -> ClauseLiteral:
-    def get_unit(self, model: dict[BooleanVariable, bool]) -> ClauseLiteral:
-        if not self.is_unit(model):
-            # TODO: custom exception
-            # TODO: more info in exception message
-            raise Exception("Clause is not unit")
-        # At this point, it is guaranteed that there is exactly one unassigned literal.
-        # Find it and return it imeediately.
-        for var, polarity in self.get_literals_polarity_map().items():
-            # Unassigned literal:
-            if var not in model:
-                # NOTE: return ClauseLiteral or tuple[BooleanVariable, bool] ?
-                return self.get_literal(var)
+    def is_unit(self, true_lits: bytearray) -> bool:
+        return self.check_unit(true_lits)[0] is ClauseStatusEnum.UNIT
+
+    def check_unit(self, true_lits: bytearray) -> tuple[ClauseStatusEnum, ClauseLiteral | None]:
+        """
+            Single pass version of is_unit + get_unit: returns the status of the clause and, if unit,
+            its unit literal
+        """
+        # NOTE: the unassigned literals are counted as distinct literals, not as variables: a
+        #       repeated literal ('x x') can be unit, a tautology ('x !x') never is (either both its
+        #       literals are unassigned, or one of them is true)
+        lits = self.lits
+        unit_idx = -1
+        several = False
+        for i, lit in enumerate(lits):
+            # True lit:
+            if true_lits[lit]:
+                return ClauseStatusEnum.TRUE, None
+            # Unassigned lit:
+            if not true_lits[-lit]:
+                if unit_idx < 0:
+                    unit_idx = i
+                # Second unassigned lit, not unit (a true lit may follow, keep looking):
+                elif lits[unit_idx] != lit:
+                    several = True
+        if several:
+            return ClauseStatusEnum.CONSISTENT, None
+        if unit_idx < 0:
+            return ClauseStatusEnum.INCONSISTENT, None
+        return ClauseStatusEnum.UNIT, self.children[unit_idx]
+
+    def get_unit(self, true_lits: bytearray) -> ClauseLiteral:
+        """
+            Returns the unit literal of the clause. Precondition: the clause is unit (the callers
+            already know it, the check only runs in debug mode, i.e. not with python -O)
+        """
+        status, unit = self.check_unit(true_lits)
+        assert status is ClauseStatusEnum.UNIT, f"Clause { self } is not unit"
+        return unit
+
+    def notify_falsified(self, false_lit: int, true_lits: bytearray) -> tuple[WatchStatusEnum, int]:
+        """
+            Notify the clause that one of its watched literals (false_lit, encoded) has been made false.
+            The model is given indexed by encoded literal (true_lits[lit] is 1 iff lit is true, see
+            ImplicationGraph.true_lits).
+            Returns the outcome and the index of the relevant literal:
+              - RELOCATED: the watch moved to the (non-false) literal at the returned index
+              - TRUE: the clause is satisfied by the other watched literal at the returned index
+              - UNIT: the other watched literal (at the returned index) is the only non-false one
+              - CONFLICT: all the literals are false
+        """
+        lits = self.lits
+        w1, w2 = self.w1, self.w2
+        # Make w1 the falsified watch:
+        if lits[w1] != false_lit:
+            w1, w2 = self.w1, self.w2 = w2, w1
+        # The other watched literal is true, nothing to do:
+        other_lit = lits[w2]
+        if true_lits[other_lit]:
+            return WatchStatusEnum.TRUE, w2
+        # Look for a non-false literal to watch instead:
+        # NOTE: the search is circular, starting right after the falsified watch w1: the literals
+        #       before it have been found false (or skipped) the last time the watch moved, so
+        #       they are less likely to be non-false than the ones after it
+        n = len(lits)
+        i = w1
+        for _ in range(n - 1):
+            i += 1
+            if i == n:
+                i = 0
+            # Not false lit, other than the other watch:
+            if i != w2 and not true_lits[-lits[i]]:
+                self.w1 = i
+                return WatchStatusEnum.RELOCATED, i
+        if not true_lits[-other_lit]:
+            return WatchStatusEnum.UNIT, w2
+        return WatchStatusEnum.CONFLICT, w2
 
     def resolve_with(self, premise: 'Clause', name: str | None = None) -> 'Clause':
         """
             Resolve this clause with another clause (premise). The conclusion is returned.
         """
-        lits = set(chain(self.get_literals(), premise.get_literals()))
+        # NOTE: resolution on the encoded literals: union of the literals, minus the complementary ones
+        lits = set(self.lits)
+        lits.update(premise.lits)
         # Use the subclass of self to create the new clause:
-        return type(self)([ lit for lit in lits if ClauseLiteral(lit.variable, not lit.polarity) not in lits ], name=name)
+        pool = self.children[0].variable.pool if self.children else None
+        return type(self).from_lits([ lit for lit in lits if -lit not in lits ], pool, name=name)
+
+    @classmethod
+    def from_lits(cls, lits: Iterable[int], pool: VarPool | None = None, name: str | None = None) -> 'Clause':
+        """
+            Builds a clause from its encoded literals (see encode_literal), on the variables of the
+            pool (the default one if None)
+        """
+        return cls([ ClauseLiteral.intern_id(var_of(lit), pol_of(lit), pool) for lit in lits ], name=name)
 
     def resolve(self, premise: 'Clause') -> None:
         """
@@ -390,24 +665,32 @@ class Clause(NAryNode):
 
     # NOTE: put this in superclass?
     def __eq__(self, other):
-        return isinstance(other, Clause) and self.children == other.children
+        return self is other or (isinstance(other, Clause) and self.lit_set == other.lit_set)
 
     def __hash__(self):
-        return hash(tuple(self.children))
+        return self._hash
+
+    def order_key(self) -> tuple:
+        return (4, tuple(sorted(self.lit_set)))
 
     def __str__(self):
-        return f"{ self.name or '' }{ ': ' if self.name else '' }( { ' OR '.join(str(child) for child in self.children) } )"
+        if self._str_cache is None:
+            self._str_cache = f"{ self.name or '' }{ ': ' if self.name else '' }( { ' OR '.join(map(str, self.children)) } )"
+        return self._str_cache
 
-    def __repr__(self):
-        return self.__str__()
+    __repr__ = __str__
 
 class LearnedClause(Clause):
     """
         A learned clause. Keeps track of resolution steps that led to its creation.
     """
+    __slots__ = ('resolution_steps', '_formula_clauses')
+
     def __init__(self, children: Iterable['ClauseLiteral'], name: str | None = None, resolution_steps: Iterable['Clause'] | None = None):
         super().__init__(children, name)
         self.resolution_steps = resolution_steps    # NOTE: keep it Null? or empty list? ('... = resolution_steps or []')
+        # Memoized result of get_resolution_formula_clauses
+        self._formula_clauses: frozenset[Clause] | None = None
 
     def is_learned(self) -> bool:
         return True
@@ -420,18 +703,22 @@ class LearnedClause(Clause):
         """
         return LearnedClause(clause.get_literals(), name=clause.name)
 
-    # NOTE//XXX: this is done iteratively here! Might not be the bes approach.
+    # NOTE//XXX: this is done recursively here! Might not be the bes approach.
     # TODO: consider doing this iteratively.
     def get_resolution_formula_clauses(self) -> Iterable[Clause]:
         """
             Get the clauses that were used in the resolution steps to derive this clause.
         """
-        # return [ step if not step.is_learned() else step.get_resolution_formula_clauses() for step in self.resolution_steps ]
-        # return { step if not step.is_learned() else step.get_resolution_formula_clauses() for step in self.resolution_steps }
-        clauses = set()
-        for step in self.resolution_steps:
-            if not step.is_learned():
-                clauses.add(step)
-            else:
-                clauses.update(step.get_resolution_formula_clauses())
-        return clauses
+        # NOTE: memoized, as learned clauses are shared by the proofs of the later ones (the
+        #       resolution steps are final once the result has been requested)
+        if self._formula_clauses is None:
+            # return [ step if not step.is_learned() else step.get_resolution_formula_clauses() for step in self.resolution_steps ]
+            # return { step if not step.is_learned() else step.get_resolution_formula_clauses() for step in self.resolution_steps }
+            clauses = set()
+            for step in self.resolution_steps:
+                if not step.is_learned():
+                    clauses.add(step)
+                else:
+                    clauses.update(step.get_resolution_formula_clauses())
+            self._formula_clauses = frozenset(clauses)
+        return self._formula_clauses
@@ -1,14 +1,19 @@
 from src.datastructs.formula import *
 
-# HACK: quick and dirty implementation
 def parse_dimacs(file_path: str) -> tuple[list[BooleanVariable], list[Clause]]:
 
     with open(file_path, "r") as file:
-        lines = file.readlines()
-        # Remove comments:
-        lines = [l for l in lines if not l.startswith("c")]
-        # Read header:
-        header = lines[0].split()
+        # NOTE: the file is streamed, comments are skipped while reading it
+
+        # Read header (first non-comment line):
+        for line in file:
+            if line.startswith("c") or not line.strip():
+                continue
+            header = line.split()
+            break
+        else:
+            header = [ ]
+        assert len(header) == 4
         assert header[0] == "p"
         assert header[1] == "cnf"
         num_vars = int(header[2])
@@ -16,18 +21,30 @@ def parse_dimacs(file_path: str) -> tuple[list[BooleanVariable], list[Clause]]:
         num_clauses = int(header[3])
 
         # Create variables:
-        variables = [BooleanVariable(f"v{i}") for i in range(1, num_vars + 1)]
+        # NOTE: in a pool of their own, so that the ids of the formula are 0, ..., num_vars - 1
+        pool = VarPool()
+        variables = [BooleanVariable(f"v{i}", pool) for i in range(1, num_vars + 1)]
 
         # Read clauses:
+        # NOTE: clauses are terminated by 0, and can span several lines; literals are looked up
+        #       by their DIMACS code, each built once
+        literals: dict[int, ClauseLiteral] = dict()
         clauses = []
-        for l in lines[1:]:
-            clause = []
-            for lit in l.split():
-                if lit == "0":
-                    break
-                lit = int(lit)
-                var = variables[abs(lit) - 1]
-                clause.append(ClauseLiteral(var, lit > 0))
+        clause = []
+        for line in file:
+            if line.startswith("c"):
+                continue
+            for lit in map(int, line.split()):
+                if lit == 0:
+                    clauses.append(Clause(clause))
+                    clause = []
+                    continue
+                clause_lit = literals.get(lit)
+                if clause_lit is None:
+                    clause_lit = literals[lit] = ClauseLiteral.intern(variables[abs(lit) - 1], lit > 0)
+                clause.append(clause_lit)
+        # Last clause, if not terminated:
+        if clause:
             clauses.append(Clause(clause))
 
         return variables, clauses
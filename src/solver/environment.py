@@ -1,41 +1,32 @@
 import logging
 from collections import defaultdict
-from itertools import chain
+from typing import Callable
 
 from src.datastructs.formula import *
 from src.solver.exceptions import *
+from src.solver.heuristics import VSIDS
+from src.solver.status import SolverStatus, SolverStatusEnum
 
 """
     This module contains the SolverEnvironment class, which is responsible for
     managing the state of the solver.
 """
 
+# NOTE: the level is left to the application (e.g. logging.basicConfig(level=logging.DEBUG))
 _logger = logging.getLogger(__name__)
-_logger.setLevel(logging.DEBUG)
 
-# FIXME: no need to store the antecedent clause for every parent of a unit propagation step,
-#        as it is the same for all parents of the same step
-class StepParent:
-    """
-        A parent of a solver step
-    """
-    def __init__(self, lit: ClauseLiteral, clause: Clause):
-        self.literal = lit
-        self.clause = clause
-
-    def __str__(self):
-        return f"StepParents({self.parents})"
-
-    def __repr__(self):
-        return self.__str__()
+# Separators of the debug log
+_SEPARATOR = "= "*32
+_SUB_SEPARATOR = ". "*32
 
 class SolverStep:
     """
         A step in the solver stack
     """
-    def __init__(self, lit: ClauseLiteral, parents: list[StepParent], decision_level: int = 0):
-        self.parents = parents
-        self.parents_map = { parent.literal.variable: parent for parent in parents }
+    # NOTE: steps are created for every assignment, keep them small
+    __slots__ = ('literal', 'decision_level')
+
+    def __init__(self, lit: ClauseLiteral, decision_level: int = 0):
         self.literal = lit
         self.decision_level = decision_level
 
@@ -45,8 +36,20 @@ class SolverStep:
     def is_unit(self):
         raise NotImplementedError
 
-    def get_parents(self):
-        return self.parents
+    def get_parents(self) -> list[ClauseLiteral]:
+        """
+            Returns the assignments (literals) that implied this step, i.e. its parents in the
+            implication graph
+        """
+        return [ ]
+
+    @property
+    def parents(self) -> list[ClauseLiteral]:
+        return self.get_parents()
+
+    @property
+    def parents_map(self) -> dict[BooleanVariable, ClauseLiteral]:
+        return { parent.variable: parent for parent in self.get_parents() }
 
     def get_decision_level(self):
         return self.decision_level
@@ -64,10 +67,17 @@ class UnitPropagationStep(SolverStep):
     """
         A unit propagation step
     """
-    def __init__(self, lit: ClauseLiteral, parents: list[StepParent], antecedent_clause: Clause, decision_level: int = 0):
-        super().__init__(lit, parents, decision_level)
+    __slots__ = ('antecedent_clause',)
+
+    def __init__(self, lit: ClauseLiteral, antecedent_clause: Clause, decision_level: int = 0):
+        super().__init__(lit, decision_level)
         self.antecedent_clause = antecedent_clause
 
+    def get_parents(self) -> list[ClauseLiteral]:
+        # NOTE: built on demand from the antecedent clause (conflict analysis only needs the clause):
+        #       the parents are the assignments falsifying its other literals
+        return [ lit.negation for lit in self.antecedent_clause.get_literals() if lit.variable != self.literal.variable ]
+
     def is_decision(self):
         return False
 
@@ -84,8 +94,10 @@ class DecisionStep(SolverStep):
     """
         A decision step
     """
+    __slots__ = ()
+
     def __init__(self, lit: ClauseLiteral, decision_level: int = 0):
-        super().__init__(lit, [], decision_level)
+        super().__init__(lit, decision_level)
 
     def is_decision(self):
         return True
@@ -106,7 +118,52 @@ class ImplicationGraph:
         self.decision_level = 0
         # self.stack: list[Literal] = [ ]
         self.stack: list[SolverStep] = [ ]
-        self.lits_map: dict[BooleanVariable, SolverStep] = dict()
+        # NOTE: kept up to date on every assignment, instead of being rebuilt from the stack
+        self.model_map: dict[BooleanVariable, bool] = dict()
+        # Assigned variables: assigned[id] is 1 iff the variable is assigned (see VSIDS.pop_unassigned)
+        self.assigned = bytearray()
+        # NOTE: flat views of the stack, for the hot paths that do not need the step objects:
+        #       - trail: encoded literal (see encode_literal) of each step, parallel to the stack
+        #       - levels: decision level of the assignment of each variable (by id), meaningful
+        #         only if assigned
+        #       - decision_indices: index in the stack of each decision, by decision level - 1
+        # NOTE: these are lists, not preallocated arrays with a top index: in CPython, list.append
+        #       and list.pop are cheaper than an index store plus a top counter update, and reading
+        #       a list of ints does not box a new int object the way array('i') does. Same for the
+        #       stack, which thus stays a plain list
+        self.trail: list[int] = [ ]
+        self.levels: list[int] = [ ]
+        self.decision_indices: list[int] = [ ]
+        # Same model, indexed by encoded literal: true_lits[lit] is 1 iff lit is true (so lit is
+        # false iff true_lits[-lit]). NOTE: negative literals use Python's negative indexing, the
+        # array has room for 2 * n_vars + 1 items: [ 0, 1, ..., n_vars, -n_vars, ..., -1 ]
+        self.true_lits = bytearray(1)
+        # Subscribers notified with the variable id of every assignment / unassignment, e.g. the
+        # decision heuristic (see SolverEnvironment.cdcl). NOTE: the propagation queue is not a
+        # subscriber, the watches pull the new assignments from the trail (see propagate_watches)
+        self.on_assign: list[Callable[[int], None]] = [ ]
+        self.on_unassign: list[Callable[[int], None]] = [ ]
+
+    def reserve(self, n_vars: int):
+        """
+            Makes room in the model arrays for variables with id lower than n_vars
+        """
+        if n_vars > len(self.assigned):
+            padding = bytes(n_vars - len(self.assigned))
+            self.assigned.extend(padding)
+            self.levels.extend([ 0 ] * len(padding))
+            # The halves for the positive and the negative literals must stay apart, rebuild
+            self.true_lits = bytearray(2 * n_vars + 1)
+            for lit in self.trail:
+                self.true_lits[lit] = 1
+
+    @property
+    def lits_map(self) -> dict[BooleanVariable, SolverStep]:
+        """
+            Returns the step of each assigned variable.
+            NOTE: built from the stack on each access, as no solving path reads it
+        """
+        return { step.literal.variable: step for step in self.stack }
 
     def is_consistent(self):
         return not any(self.is_conflict(lit) for lit in self.nodes)
@@ -145,11 +202,7 @@ class ImplicationGraph:
         """
         # if not self.is_conflict(lit):
         if True:
-            parents = [ ]
-            for p_lit in antecedent_clause.get_literals():
-                # NOTE: can the same objects as in the clause be used here?
-                parents.append(StepParent(p_lit, antecedent_clause))
-            node = UnitPropagationStep(lit, parents, antecedent_clause, self.decision_level)
+            node = UnitPropagationStep(lit, antecedent_clause, self.decision_level)
             self._add_node(node)
         else:
             # TODO: custon exception
@@ -158,30 +211,78 @@ class ImplicationGraph:
 
     def _add_node(self, node: SolverStep):
         self.stack.append(node)
-        self.lits_map[node.literal.variable] = node
+        self.model_map[node.literal.variable] = node.literal.polarity
+        var_id = node.literal.variable.id
+        lit = node.literal.code
+        self.trail.append(lit)
+        self.true_lits[lit] = 1
+        self.levels[var_id] = node.decision_level
+        if node.is_decision():
+            self.decision_indices.append(len(self.stack) - 1)
+        self.assigned[var_id] = 1
+        for callback in self.on_assign:
+            callback(var_id)
 
     def get_last_decision(self) -> SolverStep:
-        for node in reversed(self.stack):
-            if node.is_decision():
-                return node
-        return None
+        if not self.decision_indices:
+            return None
+        return self.stack[self.decision_indices[-1]]
 
     def get_last_step(self) -> SolverStep:
         return self.stack[-1]
 
     def pop(self) -> SolverStep:
         res = self.stack.pop()
-        del self.lits_map[res.literal.variable]
+        self.true_lits[self.trail.pop()] = 0
+        del self.model_map[res.literal.variable]
+        if res.is_decision():
+            self.decision_level -= 1
+            self.decision_indices.pop()
+        var_id = res.literal.variable.id
+        self.assigned[var_id] = 0
+        for callback in self.on_unassign:
+            callback(var_id)
         return res
 
-    def pop_until_decision(self) -> Iterable[SolverStep]:
-        while not self.is_decision(self.stack[-1]):
-            res = self.stack.pop()
-            del self.lits_map[res.literal.variable]
-            yield res
-        es = self.stack.pop()
-        del self.lits_map[res.literal.variable]
-        yield res
+    def backjump_to(self, level: int) -> int:
+        """
+            Pops all the steps above the given decision level (the level itself is kept), and
+            returns the number of popped steps
+        """
+        if level >= self.decision_level:
+            return 0
+        # NOTE: same as calling pop until the decision of level + 1 is popped, in a single loop
+        #       with the per-step work only: the stack, the trail and the decision indices are
+        #       truncated at once
+        cut = self.decision_indices[level]
+        stack, true_lits, assigned = self.stack, self.true_lits, self.assigned
+        model_map, callbacks = self.model_map, self.on_unassign
+        for i in range(len(stack) - 1, cut - 1, -1):
+            lit = stack[i].literal
+            variable = lit.variable
+            var_id = variable.id
+            true_lits[lit.code] = 0
+            del model_map[variable]
+            assigned[var_id] = 0
+            for callback in callbacks:
+                callback(var_id)
+        n_popped = len(stack) - cut
+        del stack[cut:]
+        del self.trail[cut:]
+        del self.decision_indices[level:]
+        self.decision_level = level
+        return n_popped
+
+    def pop_until_decision(self) -> list[SolverStep]:
+        """
+            Pops the steps of the current decision level, its decision included (the last popped),
+            and returns them. Nothing is popped at decision level 0
+        """
+        if not self.decision_indices:
+            return [ ]
+        # NOTE: the number of steps to pop is known from the index of the last decision, there is
+        #       no need to test every step
+        return [ self.pop() for _ in range(len(self.stack) - self.decision_indices[-1]) ]
 
     def add_edge(self, parent: Literal, child: Literal, clause: Clause):
         """
@@ -205,9 +306,10 @@ class ImplicationGraph:
 
     def get_model_map(self) -> dict[BooleanVariable, bool]:
         """
-            Returns the (partial) model of the implication graph as a dict
+            Returns the (partial) model of the implication graph as a dict.
+            NOTE: the dict is live (updated on every assignment), copy it to keep a snapshot
         """
-        return { node.literal.variable: node.literal.polarity for node in self.stack }
+        return self.model_map
 
     def is_decision(self, lit: Literal):
         """
@@ -233,23 +335,50 @@ class SolverEnvironment:
     """
     def __init__(self):
         self.variables: list[BooleanVariable] = [ ]
+        # Same variables as a set, for O(1) membership tests (see add_clause)
+        self._var_set: set[BooleanVariable] = set()
         self.clauses: list[Clause] = [ ]
         self.learned_clauses: list[Clause] = [ ]
-        self.variables_occurrences: dict[BooleanVariable, int] = defaultdict(lambda: 0)
+        # Number of clauses containing each variable, as a flat list indexed by variable id
+        self.variables_occurrences: list[int] = [ ]
         # self.model_map: dict[Literal, SolverStep] = dict()
         # self.stack: dict[BooleanVariable, SolverStep] = dict()
         # self.current_decision_step: DecisionStep = DecisionStep(None, None)
         self.implication_graph: ImplicationGraph = ImplicationGraph()
+        # Clauses watching each literal (encoded, see encode_literal), and index of the first step of
+        # the stack not propagated yet
+        self.watches: dict[int, list[Clause]] = defaultdict(list)
+        # NOTE: the binary clauses are not in the watches, they are stored inline by literal: for
+        #       each literal, the (encoded literal, literal, clause) of the other literal of every
+        #       binary clause containing it. There is no watch to move, so their propagation is a
+        #       lookup in true_lits per clause
+        self.binary_watches: dict[int, list[tuple[int, ClauseLiteral, Clause]]] = defaultdict(list)
+        self.propagation_head = 0
+        # Variables (by id) of the clause under construction in conflict_analysis, all unmarked
+        # between two conflicts
+        self._seen = bytearray()
+        # Decision heuristic (set up by cdcl, once the variables are known)
+        self.vsids: VSIDS | None = None
+        # Original clauses from which the conflict at decision level 0 was derived (set on UNSAT,
+        # see conflict_analysis)
+        self.unsat_core: Iterable[Clause] | None = None
 
     def add_clause(self, clause: Clause):
         """
             Adds a clause to the solver environment
         """
         self.clauses.append(clause)
-        # NOTE: O(n^2) !
-        self.variables.update({var for var in clause.variables() if var not in self.variables})
-        for var in clause.variables():
-            self.variables_occurrences[var] += 1
+        # NOTE: from the literals, not get_variables, so that the clause maps stay unbuilt
+        occurrences = self.variables_occurrences
+        for var_id in { abs(lit) - 1 for lit in clause.lits }:
+            if var_id >= len(occurrences):
+                occurrences.extend([ 0 ] * (var_id + 1 - len(occurrences)))
+            occurrences[var_id] += 1
+        for lit in clause.children:
+            var = lit.variable
+            if var not in self._var_set:
+                self._var_set.add(var)
+                self.variables.append(var)
 
     def unit_propagate_literal(self, clause: Clause, lit: Literal):
         """
@@ -266,65 +395,138 @@ class SolverEnvironment:
         for c in self.clauses:
             self.unit_propagate_literal(c, lit)
 
-    def unit_propagate(self):
+    def watch_clause(self, clause: Clause):
         """
-            Performs unit propagation
+            Registers the watched literals of a clause
         """
+        if len(clause) == 2:
+            (lit1, lit2), (cl_lit1, cl_lit2) = clause.lits, clause.get_literals()
+            self.binary_watches[lit1].append((lit2, cl_lit2, clause))
+            self.binary_watches[lit2].append((lit1, cl_lit1, clause))
+            return
+        self.watches[clause.lits[clause.w1]].append(clause)
+        if clause.w2 != clause.w1:
+            self.watches[clause.lits[clause.w2]].append(clause)
+
+    def propagate_watches(self) -> Clause | None:
+        """
+            Visits the clauses watching the assignments not propagated yet (two-watched-literals scheme).
+            Returns the conflict clause, if any
+        """
+        # NOTE: hot loop, bind the attributes and the methods used for every watcher to locals
+        graph = self.implication_graph
+        true_lits = graph.true_lits
+        trail = graph.trail
+        watches = self.watches
+        binary_watches = self.binary_watches
+        add_unit = graph.add_unit
+        # NOTE: the level is checked once per call, not once per deduced unit
+        debug = _logger.isEnabledFor(logging.DEBUG)
+        RELOCATED, UNIT, CONFLICT = WatchStatusEnum.RELOCATED, WatchStatusEnum.UNIT, WatchStatusEnum.CONFLICT
+        while self.propagation_head < len(trail):
+            lit = trail[self.propagation_head]
+            self.propagation_head += 1
+            # Only the clauses watching the literal made false by the assignment are visited
+            false_lit = -lit
+            # Binary clauses first: the other literal is either true, false (conflict) or unit
+            # NOTE: on conflict, the watches of false_lit are left untouched (not visited yet)
+            for other, other_lit, clause in binary_watches[false_lit]:
+                if true_lits[other]:
+                    continue
+                if true_lits[-other]:
+                    _logger.debug("Conflict detected with clause %s", clause)
+                    return clause
+                add_unit(other_lit, clause)
+                if debug:
+                    _logger.debug("Clause %s is unit: deduced %s", clause, other_lit)
+            watchers = watches[false_lit]
+            # Rebuild the watch list, keeping only the clauses whose watch did not move
+            kept = watches[false_lit] = [ ]
+            keep = kept.append
+            for i, clause in enumerate(watchers):
+                # Fast path: the other watched literal is true, the clause stays as it is (same
+                # check as in Clause.notify_falsified, without the call)
+                lits = clause.lits
+                if true_lits[lits[clause.w2] if lits[clause.w1] == false_lit else lits[clause.w1]]:
+                    keep(clause)
+                    continue
+                status, idx = clause.notify_falsified(false_lit, true_lits)
+                if status is RELOCATED:
+                    watches[clause.lits[idx]].append(clause)
+                    continue
+                keep(clause)
+                if status is UNIT:
+                    unit_lit = clause.children[idx]
+                    add_unit(unit_lit, clause)
+                    if debug:
+                        _logger.debug("Clause %s is unit: deduced %s", clause, unit_lit)
+                elif status is CONFLICT:
+                    kept.extend(watchers[i+1:])
+                    _logger.debug("Conflict detected with clause %s", clause)
+                    return clause
+        return None
 
-        propagation = True
-        while propagation:
-            propagation = False
-
-            # Find unit clause (if any)
-            unit_clause: Clause = None
-            unit_lit: ClauseLiteral = None
-            model_map = self.implication_graph.get_model_map()
-            for c in self.clauses:
-                status = c.get_status(model_map)
-                if status.status == ClauseStatusEnum.UNIT:
-                    propagation = True
-                    unit_clause = c
-                    unit_lit = status.unit
-                    _logger.debug(f"Unit clause found")
-                    break
-            # No unit clauses found
-            if unit_clause is None:
-                _logger.debug("No unit clauses found")
-                return None
-
-            assert unit_clause and unit_lit
-
-            # Perform unit propagation
-            self.implication_graph.add_unit(unit_lit, unit_clause)
-            model_map = self.implication_graph.get_model_map()
-            _logger.debug(f"Clause { c } is unit: deduced { unit_lit }")
-
-            # Check for conflicts
-            conflict_clause: Clause = None
-            for c in self.clauses:
-                if not c.is_consistent(model_map):
-                    conflict_clause = c
-                    _logger.debug(f"Conflict detected with clause { c }")
-                    break
-                else:
-                    pass
-                    # _logger.debug(f"Clause { c } is consistent")
+    def unit_propagate(self) -> bool:
+        """
+            Performs unit propagation (with conflict analysis and backjumping on conflicts).
+            Returns False if the formula is UNSAT (see unsat_core)
+        """
+        # NOTE: outcomes of propagation are not cached (e.g. by a Zobrist hash of the assignment):
+        #       between two conflicts the stack only grows, so an assignment never repeats, and
+        #       every conflict adds a learned clause, which would invalidate the cached outcomes.
+        #       The watches already restrict each call to the assignments not propagated yet
+        while True:
+            conflict_clause = self.propagate_watches()
 
-            # If no conflict, continue
+            # If no conflict, done
             if conflict_clause is None:
-                _logger.debug(f"Partial model { self.implication_graph.get_model() } {self.implication_graph.get_model_map() } is consistent")
-                continue
-
-            # Perform conflict analysis
-            self.conflict_analysis(conflict_clause)
-
-    def conflict_analysis(self, conflict_clause: Clause):
+                if _logger.isEnabledFor(logging.DEBUG):
+                    _logger.debug("Partial model %s %s is consistent", self.implication_graph.get_model(), self.implication_graph.get_model_map())
+                return True
+
+            # Perform conflict analysis (backjumps to where the learned clause is unit)
+            learned_clause = self.conflict_analysis(conflict_clause)
+            if learned_clause is None:
+                return False
+            self.propagation_head = min(self.propagation_head, len(self.implication_graph.stack))
+
+            # Watch the unassigned literal and the one assigned at the highest decision level,
+            # which will be the first to be unassigned on backjump
+            # NOTE: single pass over the learned clause for both watches
+            assigned = self.implication_graph.assigned
+            levels = self.implication_graph.levels
+            w1 = w2 = -1
+            w2_level = -1
+            for i, lit in enumerate(learned_clause.lits):
+                var_id = abs(lit) - 1
+                if not assigned[var_id]:
+                    w1 = i
+                else:
+                    level = levels[var_id]
+                    if level > w2_level:
+                        w2, w2_level = i, level
+            learned_clause.w1 = w1
+            learned_clause.w2 = w2 if w2 >= 0 else w1
+            self.watch_clause(learned_clause)
+
+            # Propagate the learned clause
+            unit_lit = learned_clause.get_literals()[learned_clause.w1]
+            self.implication_graph.add_unit(unit_lit, learned_clause)
+            _logger.debug("Learned clause %s is unit: deduced %s", learned_clause, unit_lit)
+
+    def conflict_analysis(self, conflict_clause: Clause) -> LearnedClause | None:
         """
-            Performs conflict analysis with resolution
+            Performs conflict analysis with resolution, then backjumps. Returns the learned clause,
+            or None if the conflict cannot be undone (UNSAT, the core is stored in unsat_core)
         """
-        _logger.debug(f"Performing conflict analysis with conflict clause { conflict_clause }")
+        _logger.debug("Performing conflict analysis with conflict clause %s", conflict_clause)
 
-        learned_clause = LearnedClause.from_clause(conflict_clause)
+        # NOTE: the clause under construction is kept as the set of its encoded literals (see
+        #       encode_literal), so that a resolution step costs the length of the antecedent; the
+        #       LearnedClause is materialized once at the end
+        lits = set(conflict_clause.lits)
+        # Pool of the variables of the formula, to materialize the literals (see Clause.from_lits)
+        pool = conflict_clause.get_literals()[0].variable.pool
 
         # HACK: if the solver is still at decision level 0, then UNSAT
         # if self.implication_graph.get_last_decision_level() == 0:
@@ -336,42 +538,80 @@ class SolverEnvironment:
         #               them (at the end, all leaves will be original clauses)
         proof_clauses = [ conflict_clause ]
 
-        # Use 'last UIP' criterion
-        while not self.implication_graph.get_last_step().is_decision() and not self.implication_graph.is_empty():
+        # Use 'first UIP' criterion: resolve until a single literal of the current decision level
+        # is left (at decision level 0, until the stack is empty: the empty clause is derived)
+        graph = self.implication_graph
+        decision_level = graph.get_decision_level()
+        levels = graph.levels
+        seen = self._seen
+        # Number of literals of the current decision level in the clause under construction
+        path_c = 0
+        for lit in lits:
+            var_id = abs(lit) - 1
+            seen[var_id] = 1
+            if levels[var_id] == decision_level:
+                path_c += 1
+        while not graph.is_empty() and (decision_level == 0 or path_c > 1):
             # Resolve with antecedent
             # TODO: make method for this
-            prev_step = self.implication_graph.pop()
-
+            prev_step = graph.pop()
+            pivot = prev_step.literal
+            pivot_id = pivot.variable.id
 
             # If the current unit propagated literal is not in the learned clause,
             # then don't resolve learned_clause with it
-            if prev_step.get_literal().variable not in learned_clause.get_variables():
-                _logger.debug(f"Variable { prev_step.get_literal().variable } is not in learned clause, skip")
+            if not seen[pivot_id]:
+                _logger.debug("Variable %s is not in learned clause, skip", pivot.variable)
                 continue
 
 
-            antecedent_clause = prev_step.get_antecedent_clause()
-            _logger.debug(f"Resolving with antecedent clause { antecedent_clause }, from which { prev_step.get_literal() } was deduced")
-            learned_clause = learned_clause.resolve_with(antecedent_clause, name=f"l{ len(self.learned_clauses) }")
-            _logger.debug(f"Resolved: { learned_clause }")
+            antecedent_clause = prev_step.antecedent_clause
+            _logger.debug("Resolving with antecedent clause %s, from which %s was deduced", antecedent_clause, pivot)
+            # NOTE: resolve on the pivot only: the other literals of the antecedent are false, as are
+            #       those of the learned clause, so no other complementary pair can appear. The pivot
+            #       is still marked while the antecedent is scanned, so that it is not added back
+            lits.discard(-pivot.code)
+            path_c -= 1
+            for lit in antecedent_clause.lits:
+                var_id = abs(lit) - 1
+                if not seen[var_id]:
+                    seen[var_id] = 1
+                    lits.add(lit)
+                    if levels[var_id] == decision_level:
+                        path_c += 1
+            seen[pivot_id] = 0
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug("Resolved: %s", Clause.from_lits(lits, pool))
             proof_clauses.append(antecedent_clause)
 
             # If clause is empty, then UNSAT (we deduces false!)
             # Intuition: if we deduce false before reaching a decision, that means the cause of the conflict
             #            is *not* the decision, but is the result of unit propagation!
             # TODO: check this statement   ^  ^  ^  ^  ^
-            if len(learned_clause) == 0:
+            if not lits:
                 # raise UnsatException(conflict_clause)
+                learned_clause = LearnedClause([ ], name=f"l{ len(self.learned_clauses) }")
                 learned_clause.resolution_steps = proof_clauses
-                raise UnsatException(learned_clause.get_resolution_formula_clauses())
+                self.unsat_core = learned_clause.get_resolution_formula_clauses()
+                return None
 
+        for lit in lits:
+            seen[abs(lit) - 1] = 0
+        if len(proof_clauses) > 1:
+            learned_clause = LearnedClause.from_lits(lits, pool, name=f"l{ len(self.learned_clauses) }")
+        else:
+            learned_clause = LearnedClause.from_clause(conflict_clause)
         learned_clause.resolution_steps = proof_clauses
 
+        # NOTE: no check for duplicates: the learned clause is falsified by the current partial
+        #       model, and an equal clause already known is watched, so it would have been found
+        #       as the conflict first (in practice, learned clauses do not repeat). A duplicate
+        #       would only cost redundant watches, it is still kept in the clauses
         self.clauses.append(learned_clause)
         self.learned_clauses.append(learned_clause)
 
-        _logger.debug(f"Learned clause: { learned_clause }")
-        _logger.debug(f"    total learned clauses: { len(self.learned_clauses) }")
+        _logger.debug("Learned clause: %s", learned_clause)
+        _logger.debug("    total learned clauses: %d", len(self.learned_clauses))
 
         # # Backjump ("original strategy" by J. P. M. Silva and K. A. Sakallah. in 'GRASP - A new Search Algorithm for Satisfiability')
         # # Reach point just before one of the assignments in the learned clause (should be a decision)
@@ -381,92 +621,138 @@ class SolverEnvironment:
         # # Pop last assignment
         # self.implication_graph.pop()
 
-        # Backjump to the the highest point where the learned clause is unit
-        _logger.debug(f"Start backjumping:")
-        learned_is_unit = False
-        while True:
-            # If stack is empty
-            if self.implication_graph.is_empty():
-                # If the clause is not unit yet, then UNSAT
-                if not learned_is_unit:
-                    # raise UnsatException(conflict_clause)
-                    raise UnsatException(conflict_clause.get_resolution_formula_clauses())
-                # Otherwise, just stop backjumping
-                _logger.debug("Clause is unit and stack is empty, stop backjumping")
-                break
-            # Get the last assignment
-            last = self.implication_graph.get_last_step()
-            _logger.debug(f"  - step: { last }")
-            # If we reach the decision level 0 => UNSAT
-            if self.implication_graph.get_last_decision_level() == 0:
-                # return False    # TODO: how to return unsat?
-                # raise UnsatException(conflict_clause)
-                raise UnsatException(conflict_clause.get_resolution_formula_clauses())
-            # If the last step is a literal in the learned clause
-            if last.get_literal().variable in learned_clause.get_variables():
-                # If the clause it not unit continue, otherwise stop
-                if not learned_is_unit:
-                    learned_is_unit = True
-                    _logger.debug(f"Learned clause is unit at { last }")
-                else:
-                    _logger.debug(f"Variable { last.get_literal().variable } is in learned clause, which is already unit. Stop here.")
-                    break
-            # Pop the last step
-            self.implication_graph.pop()
-            _logger.debug(f"Backjumped to partial model { self.implication_graph.get_model() } (popped: { last })")
-
-        _logger.debug(f"End of backjumping: partial model { self.implication_graph.get_model() }")
+        # Backjump to the the highest point where the learned clause is unit, i.e. to the second highest
+        # decision level among its literals. NOTE: backjumping must stop at the boundary of a decision
+        # level: the watches would not revisit the propagations of the assignments kept at that level
+        # Bump the variables of the learned clause (they are unassigned by the backjump below)
+        if self.vsids is not None:
+            self.vsids.bump((abs(lit) - 1 for lit in learned_clause.lits), self.implication_graph.assigned)
+
+        _logger.debug("Start backjumping:")
+        levels = sorted({ self.implication_graph.levels[abs(lit) - 1] for lit in learned_clause.lits })
+        # If the clause is falsified at decision level 0, then UNSAT
+        if levels[-1] == 0:
+            self.unsat_core = learned_clause.get_resolution_formula_clauses()
+            return None
+        backjump_level = levels[-2] if len(levels) > 1 else 0
+        n_popped = self.implication_graph.backjump_to(backjump_level)
+        _logger.debug("Backjumped to decision level %d (popped: %d steps)", backjump_level, n_popped)
+
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("End of backjumping: partial model %s", self.implication_graph.get_model())
 
         # NOTE: let unit propagation be done by the caller
-        # # Unit propagate learned clause
-        # unit_lit = learned_clause.get_unit(self.implication_graph.get_model_map())
-        # self.implication_graph.add_unit(unit_lit, unit_clause)
+        return learned_clause
 
     # TODO: return SAT as soon as the partial model is satisfiable, without
     #       deciding and/or propagating the remaining variables
-    def cdcl(self):
+    def cdcl(self) -> SolverStatus:
         """
-            Performs the Conflict-Driven Clause Learning algorithm
+            Performs the Conflict-Driven Clause Learning algorithm. Returns the outcome, with the
+            model if SAT, or the UNSAT core if UNSAT
         """
 
-        _logger.debug("Clauses:")
-        for c in self.clauses:
-            _logger.debug(f"  - { c }")
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Clauses:")
+            for c in self.clauses:
+                _logger.debug("  - %s", c)
 
-        _logger.debug("= "*32)
+        _logger.debug(_SEPARATOR)
         _logger.debug("Starting CDCL algorithm")
-        _logger.debug("= "*32)
-
-        # HACK:
-
-        try:
-            while True:
-                # Deterministic choices
-
-                conflict = self.unit_propagate()
-
-                if conflict is not None:
-                    _logger.debug(f"Conflict detected with clause { conflict }")
-
-                # Non-deterministic choices
-
-                # HACK: get first var not yet assigned, set if to false, add it to the implication graph
-                # var = next(var for var in self.variables if var not in self.implication_graph)
-                var = next(var for var in self.variables if var not in self.implication_graph.lits_map)
-                # self.implication_graph.add_node(NotLiteral(var))
-                _logger.debug("= "*32)
-                self.implication_graph.add_decision(ClauseLiteral(var, False))
-                _logger.debug(f"Decision level: { self.implication_graph.get_decision_level() }")
-                _logger.debug(f"Next decision: { var } = False")
-                _logger.debug(". "*32)
-        except StopIteration:
-            _logger.debug("= "*32)
-            _logger.debug("CDCL algorithm finished")
-            _logger.debug(f"Model: { self.implication_graph.get_model() }")
-        except UnsatException as e:
-            _logger.debug("= "*32)
-            _logger.debug("CDCL algorithm finished")
-            _logger.debug(f"UNSAT: { e.reason }")
+        _logger.debug(_SEPARATOR)
+
+        # NOTE: the search state of a previous run is discarded, every clause (learned ones
+        #       included, they are implied by the formula) is watched again from scratch
+        self.implication_graph = ImplicationGraph()
+        self.watches = defaultdict(list)
+        self.binary_watches = defaultdict(list)
+        self.propagation_head = 0
+
+        n_vars = 1 + max((var.id for var in self.variables), default=-1)
+        self.implication_graph.reserve(n_vars)
+        self._seen = bytearray(n_vars)
+        # Decision candidates, as a flat list indexed by variable id (like the model arrays)
+        variables_by_id: list[BooleanVariable | None] = [ None ] * n_vars
+        for var in self.variables:
+            variables_by_id[var.id] = var
+        self.vsids = VSIDS((var_id for var_id, var in enumerate(variables_by_id) if var is not None), n_vars)
+        # Unassigned variables are candidates for decisions again
+        self.implication_graph.on_unassign.append(self.vsids.push)
+
+        self.unsat_core = None
+        for c in self.clauses:
+            if len(c) == 0:
+                self.unsat_core = [ c ]
+                return self._unsat()
+            self.watch_clause(c)
+
+        # The watches only react to new assignments: propagate the clauses that are unit from the start
+        # NOTE: with nothing assigned, only the clauses with a single distinct literal can be unit
+        #       (e.g. 'x', 'x x', but not the tautology 'x !x', see Clause.check_unit); the others
+        #       are handled by the watches once the units are propagated
+        # NOTE: the model is re-read for every clause, as each unit extends it (e.g. duplicated
+        #       or opposite unit clauses)
+        true_lits = self.implication_graph.true_lits
+        for c in self.clauses:
+            if len(c.lit_set) != 1:
+                continue
+            status, unit = c.check_unit(true_lits)
+            if status is ClauseStatusEnum.UNIT:
+                self.implication_graph.add_unit(unit, c)
+            elif status is ClauseStatusEnum.INCONSISTENT:
+                # NOTE: always UNSAT, as there are no decisions yet
+                self.conflict_analysis(c)
+                return self._unsat()
+
+        # NOTE: no exceptions for the control flow: propagation reports UNSAT by its return value,
+        #       and SAT is found when there is no variable left to decide
+        while True:
+            # Deterministic choices
+
+            if not self.unit_propagate():
+                return self._unsat()
+
+            # Non-deterministic choices
+
+            # HACK: get the unassigned var with the highest score, set it to false, add it to the implication graph
+            # var = next(var for var in self.variables if var not in self.implication_graph)
+            # NOTE: the unassigned variable with the highest VSIDS score
+            var_id = self.vsids.pop_unassigned(self.implication_graph.assigned)
+            if var_id is None:
+                # All variables assigned without conflicts
+                return self._sat()
+            var = variables_by_id[var_id]
+            # self.implication_graph.add_node(NotLiteral(var))
+            self.implication_graph.add_decision(ClauseLiteral.intern(var, False))
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug(_SEPARATOR)
+                _logger.debug("Decision level: %d", self.implication_graph.get_decision_level())
+                _logger.debug("Next decision: %s = False", var)
+                _logger.debug(_SUB_SEPARATOR)
+
+    def _sat(self) -> SolverStatus:
+        _logger.debug(_SEPARATOR)
+        _logger.debug("CDCL algorithm finished")
+        # NOTE: sanity check of the watches, skipped with python -O
+        assert self.is_model(), "SAT, but the model does not satisfy all the clauses"
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Model: %s", self.implication_graph.get_model())
+        return SolverStatus(SolverStatusEnum.SAT, model=dict(self.implication_graph.get_model_map()))
+
+    def _unsat(self) -> SolverStatus:
+        _logger.debug(_SEPARATOR)
+        _logger.debug("CDCL algorithm finished")
+        _logger.debug("UNSAT: %s", self.unsat_core)
+        return SolverStatus(SolverStatusEnum.UNSAT, core=self.unsat_core)
+
+    def is_model(self) -> bool:
+        """
+            Returns whether the current (partial) model satisfies all the clauses
+        """
+        # NOTE: scans the literals of each clause against the model indexed by encoded literal
+        #       (see Clause.is_satisfied)
+        true_lits = self.implication_graph.true_lits
+        return all(c.is_satisfied(true_lits) for c in self.clauses)
 
     def __str__(self):
         return f"SolverEnvironment(\n  variables: {self.variables},\n  clauses: {self.clauses}\n)"
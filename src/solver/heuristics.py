@@ -0,0 +1,70 @@
+from heapq import heapify, heappop, heappush
+from typing import Iterable
+
+"""
+    This module contains the decision heuristics used by the solver.
+"""
+
+class VSIDS:
+    """
+        Variable State Independent Decaying Sum: the variables of the learned clauses get their score
+        bumped, and the bump grows geometrically (which is equivalent to decaying all the scores), so
+        that the variables involved in recent conflicts are decided first
+    """
+    # NOTE: above this bump, all the scores are rescaled (to stay far from float overflow)
+    RESCALE_LIMIT = 1e100
+
+    def __init__(self, var_ids: Iterable[int], n_vars: int, decay: float = 0.95):
+        self.var_ids = sorted(var_ids)
+        # Score of each variable, by id
+        self.activity: list[float] = [ 0.0 ] * n_vars
+        self.increment = 1.0
+        self.decay = decay
+        # Max-heap (scores negated) of (score, variable id). NOTE: entries are removed lazily: an
+        # entry is skipped when popped if its variable is assigned or its score is outdated. Every
+        # unassigned variable has an up-to-date entry (see push). Ties go to the lowest id.
+        self.heap: list[tuple[float, int]] = [ (-0.0, var_id) for var_id in self.var_ids ]
+
+    def push(self, var_id: int):
+        """
+            Makes a variable available for decisions again (to be called when it is unassigned)
+        """
+        heappush(self.heap, (-self.activity[var_id], var_id))
+
+    def bump(self, var_ids: Iterable[int], assigned: bytearray):
+        """
+            Bumps the score of the given variables, then decays all the scores
+        """
+        activity, increment = self.activity, self.increment
+        for var_id in var_ids:
+            activity[var_id] += increment
+            # Assigned variables get a new entry once unassigned:
+            if not assigned[var_id]:
+                self.push(var_id)
+        self.increment /= self.decay
+        if self.increment > self.RESCALE_LIMIT:
+            self._rescale(assigned)
+
+    def pop_unassigned(self, assigned: bytearray) -> int | None:
+        """
+            Returns the unassigned variable with the highest score (None if all are assigned)
+        """
+        heap, activity = self.heap, self.activity
+        # Drop the accumulated outdated entries from time to time:
+        if len(heap) > 4 * len(self.var_ids):
+            self._rebuild(assigned)
+        while heap:
+            score, var_id = heappop(heap)
+            if not assigned[var_id] and -score == activity[var_id]:
+                return var_id
+        return None
+
+    def _rescale(self, assigned: bytearray):
+        scale = 1 / self.RESCALE_LIMIT
+        self.activity = [ score * scale for score in self.activity ]
+        self.increment *= scale
+        self._rebuild(assigned)
+
+    def _rebuild(self, assigned: bytearray):
+        self.heap = [ (-self.activity[var_id], var_id) for var_id in self.var_ids if not assigned[var_id] ]
+        heapify(self.heap)
@@ -0,0 +1,43 @@
+import enum
+from typing import Iterable
+
+from src.datastructs.formula import *
+
+"""
+    This module contains the result returned by the solver (see SolverEnvironment.cdcl).
+"""
+
+class SolverStatusEnum(enum.Enum):
+    """
+        The possible outcomes of the solver.
+    """
+    SAT = 1
+    UNSAT = 2
+
+class SolverStatus:
+    """
+        The outcome of the solver, with the model (if SAT) or the UNSAT core (if UNSAT).
+    """
+    __slots__ = ('status', 'model', 'core')
+
+    def __init__(self, status: SolverStatusEnum, model: dict[BooleanVariable, bool] | None = None, core: Iterable[Clause] | None = None):
+        self.status = status
+        self.model = model
+        self.core = core
+
+    def is_sat(self) -> bool:
+        return self.status is SolverStatusEnum.SAT
+
+    def is_unsat(self) -> bool:
+        return self.status is SolverStatusEnum.UNSAT
+
+    def __bool__(self):
+        return self.is_sat()
+
+    def __str__(self):
+        if self.is_sat():
+            return f"SAT: { self.model }"
+        return f"UNSAT: { self.core }"
+
+    def __repr__(self):
+        return self.__str__()
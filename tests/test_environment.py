@@ -0,0 +1,122 @@
+import itertools
+import random
+import unittest
+
+from src.datastructs.formula import *
+from src.solver.environment import SolverEnvironment
+from src.solver.status import SolverStatus
+
+def _solve(cnf: list[list[int]]) -> tuple[SolverEnvironment, SolverStatus]:
+    """
+        Solves a formula given as DIMACS clauses (lists of non-zero ints)
+    """
+    n_vars = max((abs(lit) for clause in cnf for lit in clause), default=0)
+    pool = VarPool()
+    variables = [ BooleanVariable(f"v{i}", pool) for i in range(1, n_vars + 1) ]
+    env = SolverEnvironment()
+    env.variables = variables
+    env.clauses = [ Clause([ ClauseLiteral(variables[abs(lit) - 1], lit > 0) for lit in clause ]) for clause in cnf ]
+    return env, env.cdcl()
+
+def _is_model(model: dict[BooleanVariable, bool], variables: list[BooleanVariable], cnf: list[list[int]]) -> bool:
+    """
+        Returns whether the model is complete and satisfies every clause
+    """
+    return set(model) == set(variables) \
+        and all(any(model[variables[abs(lit) - 1]] == (lit > 0) for lit in clause) for clause in cnf)
+
+def _brute_force(cnf: list[list[int]], n_vars: int) -> bool:
+    """
+        Returns whether the formula is satisfiable, by trying every assignment
+    """
+    for bits in itertools.product((False, True), repeat=n_vars):
+        if all(any(bits[abs(lit) - 1] == (lit > 0) for lit in clause) for clause in cnf):
+            return True
+    return False
+
+def _random_cnf(rng: random.Random, n_vars: int) -> list[list[int]]:
+    # NOTE: the variables of a clause are drawn with replacement, so that repeated literals and
+    #       tautologies show up too
+    return [ [ rng.choice((-1, 1)) * rng.randint(1, n_vars) for _ in range(rng.choice((1, 2, 2, 3, 3, 3, 4))) ]
+             for _ in range(rng.randint(1, 5 * n_vars)) ]
+
+class TestInitialUnits(unittest.TestCase):
+
+    def test_tautology_is_not_unit(self):
+        cnf = [ [ -3, 4 ], [ -2, 3, -4 ], [ -3 ], [ 4 ], [ 2, -2, 2 ], [ -2 ] ]
+        env, result = _solve(cnf)
+        self.assertTrue(result.is_sat())
+        self.assertTrue(_is_model(result.model, env.variables, cnf))
+
+    def test_tautology_on_single_variable(self):
+        cnf = [ [ 1, -1 ], [ -1 ] ]
+        env, result = _solve(cnf)
+        self.assertTrue(result.is_sat())
+        self.assertTrue(_is_model(result.model, env.variables, cnf))
+
+    def test_repeated_literal(self):
+        _, result = _solve([ [ 1, 1 ], [ -1 ] ])
+        self.assertTrue(result.is_unsat())
+        cnf = [ [ 1, 1 ], [ -1, 2 ] ]
+        env, result = _solve(cnf)
+        self.assertTrue(result.is_sat())
+        self.assertTrue(_is_model(result.model, env.variables, cnf))
+
+class TestAddClause(unittest.TestCase):
+
+    def test_add_clause(self):
+        x, y, z = BooleanVariable("x"), BooleanVariable("y"), BooleanVariable("z")
+        env = SolverEnvironment()
+        env.add_clause(Clause([ ClauseLiteral(x, True), ClauseLiteral(y, False) ]))
+        env.add_clause(Clause([ ClauseLiteral(y, True), ClauseLiteral(z, True) ]))
+        env.add_clause(Clause([ ClauseLiteral(x, False) ]))
+        self.assertEqual(env.variables, [ x, y, z ])
+        self.assertEqual(len(env.clauses), 3)
+        model = env.cdcl().model
+        self.assertEqual((model[x], model[y], model[z]), (False, False, True))
+
+class TestSolveAgain(unittest.TestCase):
+
+    def test_solve_twice(self):
+        cnf = [ [ 1, 2 ], [ 1, -2 ], [ -1, 3 ], [ -3, 2, 4 ], [ -4, -2 ] ]
+        env, _ = _solve(cnf)
+        result = env.cdcl()
+        self.assertTrue(result.is_sat())
+        self.assertTrue(_is_model(result.model, env.variables, cnf))
+        # Each clause is watched once per watched literal
+        n_watches = sum(map(len, env.watches.values())) + sum(map(len, env.binary_watches.values()))
+        self.assertEqual(n_watches, sum(1 if len(c) == 1 else 2 for c in env.clauses))
+
+    def test_solve_twice_unsat(self):
+        cnf = [ [ 1, 2 ], [ 1, -2 ], [ -1, 2 ], [ -1, -2 ] ]
+        env, result = _solve(cnf)
+        self.assertTrue(result.is_unsat())
+        input_clauses = set(map(id, env.clauses[:len(cnf)]))
+        result = env.cdcl()
+        self.assertTrue(result.is_unsat())
+        # Core made of input clauses only (not of the clauses learned by the first run)
+        self.assertTrue(all(id(clause) in input_clauses for clause in result.core))
+
+class TestRandomFormulas(unittest.TestCase):
+
+    N_FORMULAS = 300
+
+    def test_random_formulas(self):
+        rng = random.Random(0)
+        for _ in range(self.N_FORMULAS):
+            n_vars = rng.randint(1, 9)
+            cnf = _random_cnf(rng, n_vars)
+            env, result = _solve(cnf)
+            with self.subTest(cnf=cnf):
+                self.assertEqual(result.is_sat(), _brute_force(cnf, n_vars))
+                if result.is_sat():
+                    self.assertTrue(_is_model(result.model, env.variables, cnf))
+                else:
+                    # Core made of input clauses only, unsatisfiable by itself
+                    input_clauses = { id(clause): lits for clause, lits in zip(env.clauses, cnf) }
+                    core = list(result.core)
+                    self.assertTrue(all(id(clause) in input_clauses for clause in core))
+                    self.assertFalse(_brute_force([ input_clauses[id(clause)] for clause in core ], n_vars))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from src.datastructs.formula import *
+
+class _SameHash(BooleanVariable):
+    """
+        A variable whose hash collides with every other one
+    """
+    def __hash__(self):
+        return 0
+
+class TestNodeFactory(unittest.TestCase):
+
+    def test_commutative_children_with_equal_hashes(self):
+        a, b = _SameHash("test_formula_a"), _SameHash("test_formula_b")
+        self.assertEqual(hash(a), hash(b))
+        self.assertIs(And([ a, b ]), And([ b, a ]))
+        self.assertIs(Or([ a, b ]), Or([ b, a ]))
+        self.assertEqual(str(And([ a, b ])), str(And([ b, a ])))
+
+    def test_commutative_children_negated(self):
+        a, b = BooleanVariable("test_formula_c"), BooleanVariable("test_formula_d")
+        self.assertIs(And([ NotLiteral(a), b ]), And([ b, NotLiteral(a) ]))
+
+    def test_commutative_nested_operators(self):
+        a, b = BooleanVariable("test_formula_e"), BooleanVariable("test_formula_f")
+        self.assertIs(Or([ And([ a, b ]), Not([ a ]) ]), Or([ Not([ a ]), And([ b, a ]) ]))
+
+class TestVarPool(unittest.TestCase):
+
+    def test_ids_per_pool(self):
+        pool = VarPool()
+        x, y = BooleanVariable("test_formula_p", pool), BooleanVariable("test_formula_q", pool)
+        self.assertEqual((x.id, y.id), (0, 1))
+        self.assertEqual(BooleanVariable("test_formula_p", pool).id, 0)
+        self.assertEqual(BooleanVariable("test_formula_p", pool), x)
+
+    def test_literals_per_pool(self):
+        x, other_x = BooleanVariable("test_formula_p", VarPool()), BooleanVariable("test_formula_p", VarPool())
+        self.assertNotEqual(x, other_x)
+        lit, other_lit = ClauseLiteral.intern(x, True), ClauseLiteral.intern(other_x, True)
+        self.assertIs(lit.variable, x)
+        self.assertIs(other_lit.variable, other_x)
+        self.assertIs(ClauseLiteral.intern_id(x.id, True, x.pool), lit)
+
+class TestClause(unittest.TestCase):
+
+    def test_tautology_is_not_unit(self):
+        x = ClauseLiteral(BooleanVariable("test_formula_x"), True)
+        not_x = ClauseLiteral(BooleanVariable("test_formula_x"), False)
+        # Model indexed by encoded literal (see ImplicationGraph.true_lits), x unassigned, then true
+        true_lits = bytearray(2 * (x.variable.id + 1) + 1)
+        for clause in ( Clause([ x, not_x ]), Clause([ not_x, x, not_x ]) ):
+            self.assertFalse(clause.is_unit(true_lits))
+            self.assertEqual(clause.check_unit(true_lits), (ClauseStatusEnum.CONSISTENT, None))
+        true_lits[x.code] = 1
+        for clause in ( Clause([ x, not_x ]), Clause([ not_x, x, not_x ]) ):
+            self.assertFalse(clause.is_unit(true_lits))
+            self.assertEqual(clause.check_unit(true_lits), (ClauseStatusEnum.TRUE, None))
+
+    def test_repeated_literal_is_unit(self):
+        x = ClauseLiteral(BooleanVariable("test_formula_y"), True)
+        true_lits = bytearray(2 * (x.variable.id + 1) + 1)
+        self.assertEqual(Clause([ x, x ]).check_unit(true_lits), (ClauseStatusEnum.UNIT, x))
+        true_lits[-x.code] = 1
+        self.assertEqual(Clause([ x, x ]).check_unit(true_lits), (ClauseStatusEnum.INCONSISTENT, None))
+
+    def test_equality_by_literal_set(self):
+        x = ClauseLiteral(BooleanVariable("test_formula_z"), True)
+        not_y = ClauseLiteral(BooleanVariable("test_formula_w"), False)
+        self.assertEqual(Clause([ x, not_y ]), Clause([ not_y, x, x ]))
+        self.assertEqual(hash(Clause([ x, not_y ])), hash(Clause([ not_y, x, x ])))
+        self.assertNotEqual(Clause([ x, not_y ]), Clause([ x, not_y.negation ]))
+
+if __name__ == "__main__":
+    unittest.main()
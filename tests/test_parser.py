@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from src.datastructs.formula import *
+from src.parser.dimacs import parse_dimacs
+
+def _parse(text: str) -> tuple[list[BooleanVariable], list[list[int]]]:
+    """
+        Parses a DIMACS text, returns the variables and the clauses as lists of DIMACS ints
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".cnf", delete=False) as file:
+        file.write(text)
+    try:
+        variables, clauses = parse_dimacs(file.name)
+    finally:
+        os.remove(file.name)
+    index = { var: i + 1 for i, var in enumerate(variables) }
+    return variables, [ [ index[lit.variable] * (1 if lit.polarity else -1) for lit in clause.children ] for clause in clauses ]
+
+class TestParseDimacs(unittest.TestCase):
+
+    def test_one_clause_per_line(self):
+        variables, clauses = _parse("c comment\np cnf 3 2\n1 -2 0\n2 3 0\n")
+        # Dense ids, whatever variables have been created before
+        self.assertEqual([ var.id for var in variables ], [ 0, 1, 2 ])
+        self.assertEqual(clauses, [ [ 1, -2 ], [ 2, 3 ] ])
+
+    def test_clause_spanning_lines(self):
+        _, clauses = _parse("p cnf 3 2\n1\n-2\n3 0\n-1 0\n")
+        self.assertEqual(clauses, [ [ 1, -2, 3 ], [ -1 ] ])
+
+    def test_clauses_on_one_line(self):
+        _, clauses = _parse("p cnf 3 3\n1 -2 0 2 3 0 -3 0\n")
+        self.assertEqual(clauses, [ [ 1, -2 ], [ 2, 3 ], [ -3 ] ])
+
+    def test_blank_lines_and_comments_between_clauses(self):
+        _, clauses = _parse("c header\n\np cnf 2 2\n\n1\nc inner comment\n\n-2 0\n  \n2 0\n")
+        self.assertEqual(clauses, [ [ 1, -2 ], [ 2 ] ])
+
+    def test_unterminated_last_clause(self):
+        _, clauses = _parse("p cnf 3 2\n1 2 0\n-1 3")
+        self.assertEqual(clauses, [ [ 1, 2 ], [ -1, 3 ] ])
+
+if __name__ == "__main__":
+    unittest.main()